@@ -3,10 +3,18 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+import plotly.io as pio
+from plotly.subplots import make_subplots
 import numpy as np
 import os
 
+# orjson serializes figures on its C path – every plotly_chart send
+# pays this cost, so it is the cheapest win per rerun
+try:
+    pio.json.config.default_engine = "orjson"
+except ValueError:
+    pass            # orjson missing – stdlib json still works
+
 # ─────────────────────────────────────────────────────────────
 # 1. PAGE CONFIG
 # ─────────────────────────────────────────────────────────────
@@ -19,6 +27,22 @@ st.set_page_config(page_title="Revenue Analytics Dashboard",
 # ─────────────────────────────────────────────────────────────
 CSV_FILE = "data_Conversions.csv"          # must sit next to this script
 
+MONTHS = ["Jan","Feb","Mar","Apr","May","Jun",
+          "Jul","Aug","Sep","Oct","Nov","Dec"]
+
+# columns the dashboard actually uses (post header-normalisation)
+WANTED_COLS = {
+    "month", "year", "domain", "endpoints", "revenue", "edition",
+    "product", "region", "industry", "type"
+}
+
+
+_HEADER_TRANS = str.maketrans({" ": "_"})
+
+
+def norm_header(c: str) -> str:
+    return c.strip().lower().translate(_HEADER_TRANS)
+
 
 def load_data(path: str) -> pd.DataFrame:
     fp = os.path.join(os.path.dirname(__file__), path)
@@ -26,39 +50,24 @@ def load_data(path: str) -> pd.DataFrame:
         st.error(f"❌  '{path}' not found. Place it beside dashboard.py.")
         st.stop()
 
-    df = pd.read_csv(fp)
+    # skip parsing columns the charts never touch (license_date, cpl);
+    # the pyarrow engine wants an explicit column list, so resolve it
+    # from a header-only read first
+    header = pd.read_csv(fp, nrows=0)
+    wanted = [c for c in header.columns if norm_header(c) in WANTED_COLS]
+    df = pd.read_csv(fp, usecols=wanted, engine="pyarrow")
 
     # normalise headers
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+    df.columns = [norm_header(c) for c in df.columns]
     df = df.rename(columns={"region": "country"})   # keep legacy name
 
-    expected = {
-        "month", "year", "domain", "endpoints", "revenue", "edition",
-        "license_date", "product", "country", "industry", "type", "cpl"
-    }
+    expected = (WANTED_COLS - {"region"}) | {"country"}
     if not expected.issubset(df.columns):
         st.error("❌  Expected columns missing in the CSV.")
         st.stop()
     return df
 
 
-def to_number(x):
-    if pd.isna(x):
-        return np.nan
-    return pd.to_numeric(
-        str(x).replace("$", "").replace(",", "").strip(), errors="coerce"
-    )
-
-
-def month_abbr(m: str) -> str:
-    for fmt in ("%B", "%b"):
-        try:
-            return datetime.strptime(m, fmt).strftime("%b")
-        except ValueError:
-            continue
-    return None
-
-
 def normalise_type(x: str) -> str:
     x = str(x).strip().lower()
     if x in {"0", "zero", "zero cost", "zero-cost"}:
@@ -69,61 +78,148 @@ def normalise_type(x: str) -> str:
 
 
 def process_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
+    # the frame comes straight from load_data, so it is safe to mutate
     # numeric conversions
-    df["revenue"] = df["revenue"].apply(to_number)
-    df["cpl"]     = df["cpl"].apply(to_number)
-    df["endpoints"] = pd.to_numeric(df["endpoints"], errors="coerce")
-
-    # month handling
-    df["month"] = df["month"].astype(str).apply(month_abbr)
-    month_map = {m: i for i, m in enumerate(
-        ["Jan","Feb","Mar","Apr","May","Jun",
-         "Jul","Aug","Sep","Oct","Nov","Dec"], 1)}
+    # strip currency formatting in one vectorized pass, then coerce
+    df["revenue"] = pd.to_numeric(
+        df["revenue"].astype(str)
+          .str.replace(r"[$,]", "", regex=True).str.strip(),
+        errors="coerce")
+    df["endpoints"] = pd.to_numeric(df["endpoints"], errors="coerce",
+                                    downcast="integer")
+
+    # blank domains pollute the unique-lead counts and the top-domain
+    # chart – drop them once here instead of masking per chart
+    df["domain"] = df["domain"].fillna("").astype(str).str.strip()
+    df = df[df["domain"] != ""]
+
+    # month handling – one vectorized slice normalises "Jan"/"January"/
+    # "jan" alike, and the ordered categorical maps anything else to NaN
+    # (dropped below) while keeping calendar order for free
+    df["month"] = pd.Categorical(
+        df["month"].astype(str).str.strip().str[:3].str.title(),
+        categories=MONTHS, ordered=True)
     df = df[df["month"].notna()]
-    df["month_num"] = df["month"].map(month_map)
+    df["month_num"] = df["month"].cat.codes + 1
 
     # derived cols
-    df["deployment"] = df["product"].astype(str).str.lower().apply(
-        lambda s: "Cloud" if "cloud" in s else "On-Premises")
+    df["deployment"] = np.where(
+        df["product"].astype(str).str.contains("cloud", case=False,
+                                               na=False, regex=False),
+        "Cloud", "On-Premises")
     df["edition_simple"] = (
         df["edition"].astype(str)
-          .str.split().str[0]        # Series-aware split
+          .str.extract(r"^(\S+)", expand=False)   # first token, one regex pass
           .fillna("Unknown")
     )
     df["type"] = df["type"].apply(normalise_type)
+
+    # category codes make the repeated groupbys hash-free and shrink
+    # the string columns to one stored copy per distinct value
+    for c in ("type", "deployment", "edition_simple",
+              "country", "product", "industry"):
+        df[c] = df[c].astype("category")
+
+    # sort once by the hottest group key – every sort=False groupby
+    # downstream then emits chronologically ordered groups for free
+    return df.sort_values(["year", "month_num"], kind="stable",
+                          ignore_index=True)
+
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+
+
+@st.cache_data(show_spinner=False, persist="disk")
+def load_processed(path: str, mtime: float | None) -> pd.DataFrame:
+    """CSV → processed frame. st.cache_data (keyed on path + mtime) makes
+    every rerun after the first a lookup; the on-disk parquet copy covers
+    cold starts across sessions."""
+    cache_fp = None
+    if mtime is not None:
+        cache_fp = os.path.join(CACHE_DIR, f"processed_{int(mtime)}.parquet")
+        if os.path.exists(cache_fp):
+            return pd.read_parquet(cache_fp)
+
+    df = process_data(load_data(path))
+    if cache_fp:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            df.to_parquet(cache_fp)
+        except Exception:
+            pass            # cache is best-effort; never block the app
     return df
 
 
-def compute_metrics(df: pd.DataFrame) -> dict:
-    """Return YoY %, YTD %, latest-month revenue, etc."""
-    latest_year = df["year"].max()
-    latest_month_num = df[df["year"] == latest_year]["month_num"].max()
+AGG_COLS = ("type", "country", "edition_simple",
+            "deployment", "product", "industry")
+
+
+@st.cache_data(show_spinner=False)
+def build_aggregates(_df: pd.DataFrame, mtime: float | None = None) -> dict:
+    """Every revenue-by-category table in one sweep, cached together so
+    the charts stop issuing their own full-frame groupby scans. The
+    tables are also persisted to one long-form parquet side-table so a
+    cold start skips the aggregation entirely.
+
+    The frame arrives underscore-prefixed so st.cache_data never hashes
+    it – the source-file mtime is the whole cache key, and hashing a
+    DataFrame row by row would dwarf the lookup it guards."""
+    cache_fp = (os.path.join(CACHE_DIR, f"aggregates_{int(mtime)}.parquet")
+                if mtime is not None else None)
+    if cache_fp and os.path.exists(cache_fp):
+        long = pd.read_parquet(cache_fp)
+        return {c: (long.loc[long["table"] == c, ["label", "revenue"]]
+                        .rename(columns={"label": c})
+                        .reset_index(drop=True))
+                for c in AGG_COLS}
+
+    out = {c: _df.groupby(c, sort=False, observed=True)["revenue"]
+                 .sum().reset_index()
+           for c in AGG_COLS}
+    if cache_fp:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            long = pd.concat(
+                [t.rename(columns={c: "label"}).assign(table=c)
+                 for c, t in out.items()], ignore_index=True)
+            long["label"] = long["label"].astype(str)
+            long.to_parquet(cache_fp)
+        except Exception:
+            pass            # side-table is best-effort, like the frame cache
+    return out
 
-    cur_m  = df[(df["year"] == latest_year) & (df["month_num"] == latest_month_num)]
-    prev_m = df[(df["year"] == latest_year - 1) &
-                (df["month_num"] == latest_month_num)]
 
-    pct = lambda cur, prev: (cur - prev) / prev * 100 if prev else np.nan
+def compute_metrics(df: pd.DataFrame) -> dict:
+    """Return YoY %, YTD %, latest-month revenue, etc.
 
-    yoy_rev = pct(cur_m["revenue"].sum(),  prev_m["revenue"].sum())
-    yoy_ep  = pct(cur_m["endpoints"].sum(), prev_m["endpoints"].sum())
+    Works on flat numpy arrays: one pull per column up front, then the
+    period windows combine plain boolean arrays instead of allocating
+    an indexed Series per comparison and a sliced frame per window."""
+    year = df["year"].to_numpy()
+    mnum = df["month_num"].to_numpy()
+    rev  = df["revenue"].to_numpy()
+    eps  = df["endpoints"].to_numpy()
 
-    cur_ytd  = df[(df["year"] == latest_year) &
-                  (df["month_num"] <= latest_month_num)]
-    prev_ytd = df[(df["year"] == latest_year - 1) &
-                  (df["month_num"] <= latest_month_num)]
+    latest_year = int(year.max())
+    latest_month_num = int(mnum[year == latest_year].max())
 
-    ytd_rev = pct(cur_ytd["revenue"].sum(),  prev_ytd["revenue"].sum())
-    ytd_ep  = pct(cur_ytd["endpoints"].sum(), prev_ytd["endpoints"].sum())
+    cur_y  = year == latest_year
+    prev_y = year == latest_year - 1
+    this_m = mnum == latest_month_num
+    to_m   = mnum <= latest_month_num
 
-    month_str = datetime.strptime(str(latest_month_num), "%m").strftime("%b")
+    pct = lambda cur, prev: (cur - prev) / prev * 100 if prev else np.nan
+
+    cur_m_rev = np.nansum(rev[cur_y & this_m])
+    yoy_rev = pct(cur_m_rev,                    np.nansum(rev[prev_y & this_m]))
+    yoy_ep  = pct(np.nansum(eps[cur_y & this_m]), np.nansum(eps[prev_y & this_m]))
+    ytd_rev = pct(np.nansum(rev[cur_y & to_m]),  np.nansum(rev[prev_y & to_m]))
+    ytd_ep  = pct(np.nansum(eps[cur_y & to_m]),  np.nansum(eps[prev_y & to_m]))
 
     return dict(
-        latest_year=int(latest_year),
-        latest_month=month_str,
-        latest_month_rev=cur_m["revenue"].sum(),
+        latest_year=latest_year,
+        latest_month=MONTHS[latest_month_num - 1],
+        latest_month_rev=cur_m_rev,
         yoy_rev=yoy_rev,
         yoy_ep=yoy_ep,
         ytd_rev=ytd_rev,
@@ -134,17 +230,22 @@ def compute_metrics(df: pd.DataFrame) -> dict:
 # ─────────────────────────────────────────────────────────────
 # 3. LOAD & PREP DATA
 # ─────────────────────────────────────────────────────────────
-df = process_data(load_data(CSV_FILE))
+_csv_fp = os.path.join(os.path.dirname(__file__), CSV_FILE)
+_mtime  = os.path.getmtime(_csv_fp) if os.path.exists(_csv_fp) else None
+df = load_processed(CSV_FILE, _mtime)
 if df.empty:
     st.warning("No usable rows after cleaning. Check your CSV.")
     st.stop()
 
-M = compute_metrics(df)
+M   = compute_metrics(df)
+AGG = build_aggregates(df, _mtime)
 
 # ─────────────────────────────────────────────────────────────
 # 4. GLOBAL CSS  (pretty KPI cards)
 # ─────────────────────────────────────────────────────────────
-st.markdown("""
+# NOTE: the CSS must be emitted on every run – a full rerun rebuilds the
+# element tree, so a session_state guard would drop the styling.
+GLOBAL_CSS = """
 <style>
 :root{
   --blue:#4F46E5;
@@ -179,14 +280,9 @@ st.markdown("""
 .metric-title{font-size:16px;font-weight:600;color:#475569;margin-bottom:4px;}
 .metric-sub  {font-size:13px;color:#64748B;margin-bottom:8px;}
 .metric-value{font-size:28px;font-weight:800;color:#1F2937;}
-.chart-container{
-  background:#fff;border-radius:8px;padding:15px;
-  box-shadow:0 1px 3px rgba(0,0,0,.12),
-             0 1px 2px rgba(0,0,0,.24);
-  margin-bottom:20px;
-}
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 
 st.title("Revenue Analytics Dashboard")
 
@@ -203,8 +299,11 @@ def kpi(title:str, value:str, sub:str|None=None,
             f'</div>')
 
 
-# totals
-total_rev = f"${df['revenue'].sum():,.2f}"
+# revenue by lead type – reused by the pie further down
+rev_by_type = AGG["type"]
+
+# totals – revenue folds the cached aggregate, endpoints is one scan
+total_rev = f"${rev_by_type['revenue'].sum():,.2f}"
 total_eps = f"{int(df['endpoints'].sum()):,}"
 
 # latest-month info
@@ -217,191 +316,328 @@ ytd_rev_pct  = f"{M['ytd_rev']:.1f}%"
 yoy_ep_pct   = f"{M['yoy_ep']:.1f}%"
 
 # lead counts
-unique_leads = df[["domain","type"]].drop_duplicates()
-paid_leads   = (unique_leads["type"] == "Purchased").sum()
-zero_leads   = (unique_leads["type"] == "Zero Cost").sum()
-lead_ratio   = f"{paid_leads} / {zero_leads}"
-
-# ---- ROW-1 (5 cards) ----
-c1,c2,c3,c4,c5 = st.columns(5)
-c1.markdown(kpi("Total Revenue", total_rev,
-                accent="var(--blue)"), unsafe_allow_html=True)
-c2.markdown(kpi("Latest-Month Revenue", latest_rev, latest_label,
-                accent="var(--pink)"), unsafe_allow_html=True)
-c3.markdown(kpi("Total Endpoints", total_eps,
-                accent="var(--emerald)"), unsafe_allow_html=True)
-c4.markdown(kpi(f"{latest_label} YoY Revenue", yoy_rev_pct,
-                accent="var(--amber)"), unsafe_allow_html=True)
-c5.markdown(kpi("YTD Revenue vs PY", ytd_rev_pct,
-                accent="var(--slate)"), unsafe_allow_html=True)
-
-# ---- ROW-2 (2 cards) ----
-d1,d2 = st.columns(2)
-d1.markdown(kpi("Paid vs Zero-Cost Leads", lead_ratio,
-                accent="var(--blue)"), unsafe_allow_html=True)
-d2.markdown(kpi(f"{latest_label} YoY Endpoints", yoy_ep_pct,
-                accent="var(--emerald)"), unsafe_allow_html=True)
+lead_counts = df.groupby("type", observed=True,
+                         sort=False)["domain"].nunique()
+paid_leads  = int(lead_counts.get("Purchased", 0))
+zero_leads  = int(lead_counts.get("Zero Cost", 0))
+lead_ratio  = f"{paid_leads} / {zero_leads}"
+
+# ---- both KPI rows in one markdown call: one frontend delta op and a
+# ---- single browser reflow instead of seven element nodes
+row1 = "".join((
+    kpi("Total Revenue", total_rev, accent="var(--blue)"),
+    kpi("Latest-Month Revenue", latest_rev, latest_label,
+        accent="var(--pink)"),
+    kpi("Total Endpoints", total_eps, accent="var(--emerald)"),
+    kpi(f"{latest_label} YoY Revenue", yoy_rev_pct, accent="var(--amber)"),
+    kpi("YTD Revenue vs PY", ytd_rev_pct, accent="var(--slate)"),
+))
+row2 = "".join((
+    kpi("Paid vs Zero-Cost Leads", lead_ratio, accent="var(--blue)"),
+    kpi(f"{latest_label} YoY Endpoints", yoy_ep_pct,
+        accent="var(--emerald)"),
+))
+st.markdown(
+    "<div style='display:grid;grid-template-columns:repeat(5,1fr);"
+    f"gap:16px'>{row1}</div>"
+    "<div style='display:grid;grid-template-columns:repeat(2,1fr);"
+    f"gap:16px;margin-top:16px'>{row2}</div>",
+    unsafe_allow_html=True)
 
 st.markdown("<br>", unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────────────────────
 # 6. CHARTS
 # ─────────────────────────────────────────────────────────────
-month_order = {m:i for i,m in enumerate(
-    ["Jan","Feb","Mar","Apr","May","Jun","Jul",
-     "Aug","Sep","Oct","Nov","Dec"], 1)}
+def chart_box():
+    """Bordered native container – replaces the raw-HTML chart wrapper."""
+    return st.container(border=True)
+
+
+# one registered template instead of re-specifying margins/background in
+# every builder – Plotly merges it once at figure finalisation, and the
+# builders only override the handful of values that differ
+pio.templates["dashboard"] = go.layout.Template(
+    layout=go.Layout(plot_bgcolor="white",
+                     margin=dict(t=10, l=10, r=10, b=10)))
+pio.templates.default = "plotly+dashboard"
 
 # 6-1  Monthly Revenue by Year
-rev_line = (df.groupby(["year","month","month_num"])["revenue"]
-              .sum().reset_index().sort_values(["year","month_num"]))
-f1 = px.line(rev_line, x="month_num", y="revenue", color="year",
-             markers=True,
-             labels={"month_num":"Month","revenue":"Revenue ($)"},
-             color_discrete_sequence=px.colors.qualitative.Bold)
-f1.update_xaxes(tickmode="array",
-                tickvals=list(month_order.values()),
-                ticktext=list(month_order.keys()))
-st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-st.subheader("Monthly Revenue by Year")
-st.plotly_chart(f1, use_container_width=True)
-st.markdown("</div>", unsafe_allow_html=True)
+@st.cache_data(show_spinner=False)
+def build_monthly_revenue_fig(rev_line):
+    # one Scattergl trace per year, fed numpy arrays – px.line's frame
+    # introspection and per-row dict building are skipped entirely
+    colors = px.colors.qualitative.Bold
+    f1 = go.Figure()
+    for i, (yr, sub) in enumerate(rev_line.groupby("year", sort=True)):
+        f1.add_trace(go.Scattergl(x=sub["month_num"].to_numpy(),
+                                  y=sub["revenue"].to_numpy(),
+                                  mode="lines+markers", name=str(yr),
+                                  line_color=colors[i % len(colors)]))
+    # the template's tight margins would clip the axis titles here, so
+    # let this one figure grow its margins to fit
+    f1.update_layout(xaxis_title="Month", yaxis_title="Revenue ($)",
+                     xaxis_automargin=True, yaxis_automargin=True)
+    f1.update_xaxes(tickmode="array",
+                    tickvals=list(range(1, 13)),
+                    ticktext=MONTHS)
+    return f1
+
+
+@st.fragment
+def render_monthly_revenue(df):
+    # the frame is pre-sorted by (year, month_num), so sort=False groups
+    # appear in chronological order already – no re-sort needed
+    rev_line = (df.groupby(["year","month","month_num"],
+                           observed=True, sort=False)["revenue"]
+                  .sum().reset_index())
+    with chart_box():
+        st.subheader("Monthly Revenue by Year")
+        # stable keys on every chart let the frontend patch the existing
+        # Plotly mount (react-style) instead of tearing it down
+        st.plotly_chart(build_monthly_revenue_fig(rev_line),
+                        use_container_width=True, key="monthly_revenue")
+
+
+render_monthly_revenue(df)
 
 # 6-2  Monthly Customer Acquisition (legend fix)
-acq = (df.groupby(["year","month","month_num","type"]).size()
-         .reset_index(name="count"))
-last_two = sorted(df["year"].unique())[-2:]
-acq = acq[acq["year"].isin(last_two)]
-pivot = (acq.pivot_table(index=["year","month","month_num"],
-                         columns="type", values="count",
-                         fill_value=0).reset_index())
-st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-st.subheader("Monthly Customer Acquisition (Paid vs Zero-Cost)")
-for yr in last_two:
-    sub = pivot[pivot["year"] == yr].sort_values("month_num")
+@st.cache_data(show_spinner=False)
+def build_acquisition_fig(sub, yr, show_legend):
     fg = go.Figure()
-    fg.add_trace(go.Bar(x=sub["month"], y=sub.get("Purchased",0),
+    fg.add_trace(go.Bar(x=sub["month"].astype(str), y=sub["Purchased"],
                         name="Paid", marker_color="#4F46E5"))
-    fg.add_trace(go.Bar(x=sub["month"], y=sub.get("Zero Cost",0),
+    fg.add_trace(go.Bar(x=sub["month"].astype(str), y=sub["Zero Cost"],
                         name="Zero-Cost", marker_color="#10B981"))
     fg.update_layout(
         barmode="stack",
         title=str(yr),
-        plot_bgcolor="white",
-        showlegend=bool(yr == last_two[0]),   # ← cast to native bool
-        margin=dict(t=40,l=10,r=10,b=10),
-        height=300
+        showlegend=show_legend,
+        margin=dict(t=40),           # room for the year title
+        height=300,
     )
-    st.plotly_chart(fg, use_container_width=True)
-st.markdown("</div>", unsafe_allow_html=True)
-
-# helper pie
+    return fg
+
+
+@st.fragment
+def render_monthly_acquisition(df):
+    last_two = sorted(df["year"].unique())[-2:]
+    acq = (pd.crosstab([df["year"], df["month"]], df["type"])
+             .reindex(columns=["Purchased", "Zero Cost"], fill_value=0)
+             .reset_index())
+    acq = acq[acq["year"].isin(last_two)]
+    with chart_box():
+        st.subheader("Monthly Customer Acquisition (Paid vs Zero-Cost)")
+        for yr in last_two:
+            sub = acq[acq["year"] == yr]   # rows are calendar-ordered
+            fg = build_acquisition_fig(sub, int(yr),
+                                       bool(yr == last_two[0]))
+            st.plotly_chart(fg, use_container_width=True,
+                            key=f"acquisition_{int(yr)}")
+
+
+render_monthly_acquisition(df)
+
+# helper pie – shared style dicts built once, not per figure
+PIE_TRACE_STYLE  = dict(textinfo="percent+label", textposition="outside")
+PIE_LAYOUT_STYLE = dict(height=350)
+# pies already print percent+label on every slice – rendering them
+# static drops the client-side event wiring and shrinks the payload
+PIE_CONFIG       = {"staticPlot": True, "displayModeBar": False}
+
+
+def topk_with_other(data: pd.DataFrame, key: str, k: int = 8) -> pd.DataFrame:
+    """Cap a pie payload at the k largest slices plus one 'Other' row,
+    so Plotly never receives hundreds of slices. nlargest partial-sorts
+    in O(n log k); the tail sum is total minus top, one subtraction."""
+    if len(data) <= k:
+        return data.sort_values("revenue", ascending=False)
+    top = data.nlargest(k, "revenue")
+    tail_rev = data["revenue"].sum() - top["revenue"].sum()
+    # built in one shot – no concat reallocation, and appending "Other"
+    # to a categorical key column would reject the unseen label anyway
+    return pd.DataFrame({
+        key:       list(top[key].astype(str)) + ["Other"],
+        "revenue": list(top["revenue"]) + [tail_rev],
+    })
+
+
+@st.cache_data(show_spinner=False)
+def build_pie_fig(data, names, values, seq):
+    # go.Pie directly – px.pie's frame introspection is overhead for a
+    # single pre-aggregated trace, and the text styling fits in the
+    # constructor (pie traces cycle marker_colors like px sequences)
+    fp = go.Figure(go.Pie(labels=data[names].astype(str).to_numpy(),
+                          values=data[values].to_numpy(),
+                          hole=0.4, marker_colors=list(seq),
+                          **PIE_TRACE_STYLE))
+    fp.update_layout(**PIE_LAYOUT_STYLE)
+    return fp
+
+
+@st.fragment
 def pie(title, data, names, values, seq):
-    st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-    st.subheader(title)
-    fp = px.pie(data, names=names, values=values,
-                hole=0.4, color_discrete_sequence=seq)
-    fp.update_traces(textinfo="percent+label", textposition="outside")
-    fp.update_layout(margin=dict(t=10,l=10,r=10,b=10), height=350)
-    st.plotly_chart(fp, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-# 6-3 Lead Type pie
-pie("Revenue by Lead Type",
-    df.groupby("type")["revenue"].sum().reset_index(),
-    "type","revenue",["#0088FE","#00C49F"])
-
-# 6-4 Country pie
-pie("Revenue by Country",
-    df.groupby("country")["revenue"].sum()
-      .reset_index().sort_values("revenue",ascending=False),
-    "country","revenue",px.colors.qualitative.Pastel)
-
-# 6-5 Edition pie
-pie("Revenue by Edition",
-    df.groupby("edition_simple")["revenue"].sum().reset_index(),
-    "edition_simple","revenue",
-    ["#0088FE","#00C49F","#FFBB28","#FF8042"])
-
-# 6-6 Deployment pie
-pie("Revenue by Deployment",
-    df.groupby("deployment")["revenue"].sum().reset_index(),
-    "deployment","revenue",
-    ["#0088FE","#00C49F"])
+    with chart_box():
+        st.subheader(title)
+        if len(data) < 2:
+            # single-slice pie carries no information – show the number
+            # and skip the whole figure build
+            if len(data):
+                st.metric(str(data[names].iloc[0]),
+                          f"${data[values].iloc[0]:,.0f}")
+            else:
+                st.info("No data for this breakdown.")
+            return
+        st.plotly_chart(build_pie_fig(data, names, values, seq),
+                        use_container_width=True, config=PIE_CONFIG,
+                        key=f"pie_{names}")
+
+
+@st.cache_data(show_spinner=False)
+def build_pie_grid_fig(specs):
+    """One 2×2 figure for the small category pies – a single Plotly.js
+    mount and websocket payload instead of four. specs holds
+    (title, labels, values, colors) tuples."""
+    fig = make_subplots(rows=2, cols=2,
+                        specs=[[{"type": "domain"}] * 2] * 2,
+                        subplot_titles=[s[0] for s in specs])
+    for i, (_, labels, values, colors) in enumerate(specs):
+        fig.add_trace(go.Pie(labels=labels, values=values, hole=0.4,
+                             marker_colors=list(colors),
+                             **PIE_TRACE_STYLE),
+                      row=i // 2 + 1, col=i % 2 + 1)
+    fig.update_layout(margin=dict(t=30),   # room for the subplot titles
+                      height=760, showlegend=False)
+    return fig
+
+
+# single-trace bars go through go.Figure directly – px.bar's frame
+# introspection is pure overhead for one pre-aggregated trace
+@st.cache_data(show_spinner=False)
+def build_hbar_fig(labels, values, color, left_margin, height):
+    fig = go.Figure(go.Bar(x=values, y=labels, orientation="h",
+                           marker_color=color,
+                           hovertemplate="%{y}: %{x:,.0f}<extra></extra>"))
+    fig.update_layout(margin=dict(l=left_margin),
+                      height=height,
+                      yaxis={"categoryorder": "total ascending"})
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def build_vbar_fig(labels, values, color, height):
+    fig = go.Figure(go.Bar(x=labels, y=values, marker_color=color,
+                           hovertemplate="%{x}: %{y:,}<extra></extra>"))
+    fig.update_layout(margin=dict(b=40),   # room for the bucket labels
+                      height=height)
+    return fig
+
+# 6-3…6-6  Lead Type / Country / Edition / Deployment pies in one grid
+@st.fragment
+def render_pie_grid():
+    specs = tuple(
+        (title,
+         tuple(d[key].astype(str)),
+         tuple(float(v) for v in d["revenue"]),
+         tuple(colors))
+        for title, d, key, colors in (
+            ("Revenue by Lead Type", rev_by_type, "type",
+             ["#0088FE", "#00C49F"]),
+            ("Revenue by Country",
+             topk_with_other(AGG["country"], "country"), "country",
+             px.colors.qualitative.Pastel),
+            ("Revenue by Edition",
+             topk_with_other(AGG["edition_simple"], "edition_simple"),
+             "edition_simple",
+             ["#0088FE", "#00C49F", "#FFBB28", "#FF8042"]),
+            ("Revenue by Deployment", AGG["deployment"], "deployment",
+             ["#0088FE", "#00C49F"]),
+        ))
+    with chart_box():
+        st.subheader("Revenue Breakdown")
+        st.plotly_chart(build_pie_grid_fig(specs),
+                        use_container_width=True, config=PIE_CONFIG,
+                        key="pie_grid")
+
+
+render_pie_grid()
 
 # 6-7 Product bar
-prod = (df.groupby("product")["revenue"].sum()
-          .reset_index().sort_values("revenue",ascending=False))
-st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-st.subheader("Revenue by Product")
-f_prod = px.bar(prod, y="product", x="revenue", orientation="h",
-                color_discrete_sequence=["#4F46E5"])
-f_prod.update_layout(plot_bgcolor="white",
-                     margin=dict(t=10,l=200,r=10,b=10),
-                     height=450,
-                     yaxis={"categoryorder":"total ascending"})
-st.plotly_chart(f_prod, use_container_width=True)
-st.markdown("</div>", unsafe_allow_html=True)
+@st.fragment
+def render_product_bar(prod):
+    with chart_box():
+        st.subheader("Revenue by Product")
+        f_prod = build_hbar_fig(prod["product"].to_numpy(),
+                                prod["revenue"].to_numpy(),
+                                "#4F46E5", 200, 450)
+        st.plotly_chart(f_prod, use_container_width=True,
+                        key="product_bar")
+
+
+# nlargest heap-selects the 20 biggest products; the figure's
+# categoryorder puts them in display order client-side
+render_product_bar(AGG["product"].nlargest(20, "revenue"))
 
 # 6-8 Industry pie
-ind = (df.groupby("industry")["revenue"].sum()
-         .reset_index().sort_values("revenue",ascending=False))
-ind_top = ind.head(6)
-if len(ind) > 6:
-    ind_top = pd.concat([
-        ind_top,
-        pd.DataFrame({"industry":["Other"],
-                      "revenue":[ind["revenue"].iloc[6:].sum()]})
-    ], ignore_index=True)
-pie("Revenue by Industry", ind_top, "industry", "revenue",
+pie("Revenue by Industry",
+    topk_with_other(AGG["industry"], "industry", k=6),
+    "industry", "revenue",
     px.colors.qualitative.Set3)
 
 # 6-9 Endpoint distribution
-bins = [
-    (0,100),(101,200),(201,300),(301,400),(401,500),
-    (501,600),(601,700),(701,800),(801,900),
-    (901,999),(1000,1499),(1500,1999),(2000,2499),
-    (2500,2999),(3000,4999),(5000,9999),(10000,float("inf"))
-]
-labels = [
+BIN_LOWER = np.array([
+    0,101,201,301,401,501,601,701,801,
+    901,1000,1500,2000,2500,3000,5000,10000
+])
+BIN_LABELS = [
     "0-100","101-200","201-300","301-400","401-500",
     "501-600","601-700","701-800","801-900",
     "901+","1000+","1500+","2000+","2500+",
     "3000+","5000+","10000+"
 ]
-dist = [
-    {"range":lab,
-     "count":df[(df["endpoints"]>=lo)&(df["endpoints"]<=hi)].shape[0]}
-    for (lo,hi),lab in zip(bins,labels)
-    if df[(df["endpoints"]>=lo)&(df["endpoints"]<=hi)].shape[0]
-]
-if dist:
-    ddf = pd.DataFrame(dist)
-    ddf["order"] = ddf["range"].apply(labels.index)
-    ddf = ddf.sort_values("order")
-    st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-    st.subheader("Endpoint Size Distribution")
-    f_dist = px.bar(ddf, x="range", y="count",
-                    color_discrete_sequence=["#FF8042"])
-    f_dist.update_layout(plot_bgcolor="white",
-                         margin=dict(t=10,l=10,r=10,b=40),
-                         height=400)
-    st.plotly_chart(f_dist, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment
+def render_endpoint_distribution(df):
+    ep  = df["endpoints"].dropna().to_numpy()
+    idx = np.searchsorted(BIN_LOWER, ep, side="right") - 1
+    counts = np.bincount(idx[idx >= 0], minlength=len(BIN_LABELS))
+    ddf = pd.DataFrame({"range": BIN_LABELS, "count": counts})
+    ddf = ddf[ddf["count"] > 0]          # already in bucket order
+    if ddf.empty:
+        return
+    with chart_box():
+        st.subheader("Endpoint Size Distribution")
+        f_dist = build_vbar_fig(ddf["range"].to_numpy(),
+                                ddf["count"].to_numpy(),
+                                "#FF8042", 400)
+        st.plotly_chart(f_dist, use_container_width=True,
+                        key="endpoint_distribution")
+
+
+render_endpoint_distribution(df)
+
 
 # 6-10 Top Domains
-top_dom = df["domain"].value_counts().head(10).reset_index()
-top_dom.columns = ["domain","count"]
-if not top_dom.empty:
-    st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-    st.subheader("Top 10 Domains by Frequency")
-    f_dom = px.bar(top_dom, y="domain", x="count", orientation="h",
-                   color_discrete_sequence=["#00C49F"])
-    f_dom.update_layout(plot_bgcolor="white",
-                        margin=dict(t=10,l=250,r=10,b=40),
-                        height=450,
-                        yaxis={"categoryorder":"total ascending"})
-    st.plotly_chart(f_dom, use_container_width=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+@st.fragment
+def render_top_domains(df):
+    # blanks were dropped at ingest; sort=False + nlargest heap-selects
+    # the top 10 without fully sorting the distinct-domain counts, and
+    # the Series feeds the figure straight from its index – no
+    # reset_index copy just to name columns
+    top_dom = df["domain"].value_counts(sort=False).nlargest(10)
+    if top_dom.empty:
+        return
+    with chart_box():
+        st.subheader("Top 10 Domains by Frequency")
+        f_dom = build_hbar_fig(top_dom.index.to_numpy(),
+                               top_dom.to_numpy(),
+                               "#00C49F", 250, 450)
+        st.plotly_chart(f_dom, use_container_width=True,
+                        key="top_domains")
+
+
+render_top_domains(df)
 
 # ─────────────────────────────────────────────────────────────
 # 7. FOOTER